@@ -1,11 +1,27 @@
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime
+from sqlalchemy import create_engine, select, update, Column, Integer, String, Float, DateTime, Index
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.schema import CreateIndex
 from datetime import datetime
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./insurance.db")
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# Pool is per process — with several uvicorn workers, divide these by the worker count.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "40"))
+
+_connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+
+engine = create_engine(
+    DATABASE_URL,
+    connect_args=_connect_args,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_recycle=3600,
+    pool_pre_ping=True,
+    pool_timeout=5,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -30,8 +46,45 @@ class InsurancePlan(Base):
     scraped_at = Column(DateTime, default=datetime.utcnow)
 
 
+class PlansVersion(Base):
+    """Single-row counter bumped on every write to insurance_plans."""
+    __tablename__ = "plans_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+# Indexes for /api/plans filtering + CSR ordering and /api/stats grouping
+Index("ix_plan_source_csr", InsurancePlan.source, InsurancePlan.claim_settlement_ratio.desc())
+Index("ix_plan_csr", InsurancePlan.claim_settlement_ratio.desc())
+# Plan lookups by name (scraper upserts match on plan_name + provider)
+Index("ix_plan_name_provider", InsurancePlan.plan_name, InsurancePlan.provider)
+
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    # create_all skips existing tables, so add indexes missing from older DBs
+    with engine.begin() as conn:
+        for index in InsurancePlan.__table__.indexes:
+            conn.execute(CreateIndex(index, if_not_exists=True))
+    try:
+        with engine.begin() as conn:
+            if conn.execute(select(PlansVersion.id)).first() is None:
+                conn.execute(PlansVersion.__table__.insert().values(id=1, version=0))
+    except IntegrityError:
+        pass  # another worker inserted it first
+
+
+def bump_plans_version(db):
+    """
+    Mark the plans table as changed, inside the caller's transaction.
+    Every worker compares this against its in-memory plans snapshot.
+    """
+    db.execute(update(PlansVersion).where(PlansVersion.id == 1).values(version=PlansVersion.version + 1))
+
+
+def get_plans_version(db) -> int:
+    return db.execute(select(PlansVersion.version).where(PlansVersion.id == 1)).scalar() or 0
 
 
 def get_db():
@@ -2,11 +2,15 @@
 Gemini LLM integration for analyzing and ranking term insurance plans.
 Uses google-generativeai (gemini-1.5-flash) to produce structured recommendations.
 """
+import hashlib
 import json
 import logging
 import os
 import re
-from typing import List, Dict, Any
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional
 
 import google.generativeai as genai
 from dotenv import load_dotenv
@@ -28,6 +32,10 @@ _MODEL_FALLBACKS = [
 ]
 
 
+class FallbackResult(dict):
+    """A rule-based answer returned because Gemini was unavailable; callers should not cache it."""
+
+
 def _get_working_model():
     """Return the first model that responds without quota errors."""
     for name in _MODEL_FALLBACKS:
@@ -43,22 +51,12 @@ def _get_working_model():
     return None
 
 
-def _build_prompt(user: Dict, plans: List[Dict]) -> str:
-    plans_text = json.dumps(plans, indent=2)
-    return f"""
-You are an expert Indian term insurance advisor. Analyze the following term insurance plans and recommend the best ones for the user described below.
+_ADVISOR_ROLE = (
+    "You are an expert Indian term insurance advisor. Analyze the following term insurance plans "
+    "and recommend the best ones for the user described below."
+)
 
-USER PROFILE:
-- Age: {user['age']} years
-- Desired Sum Assured: ₹{user['sum_assured']} Lakhs
-- Maximum Annual Premium Budget: ₹{user['premium_budget']}
-- Desired Policy Term: {user['policy_term']} years
-- Minimum Claim Settlement Ratio preferred: {user['min_csr']}%
-
-AVAILABLE PLANS (filtered for this user's age):
-{plans_text}
-
-INSTRUCTIONS:
+_RANKING_INSTRUCTIONS = """INSTRUCTIONS:
 1. Rank ALL plans from best to worst for this specific user.
 2. For each plan provide: rank, plan_name, provider, reason (2-3 sentences explaining why it suits or doesn't suit the user), score (0-100), and a pros/cons list.
 3. Give an overall_summary paragraph (3-4 sentences) explaining the top recommendation clearly.
@@ -66,11 +64,11 @@ INSTRUCTIONS:
 5. If a plan's premium exceeds the budget, flag it clearly.
 
 Respond ONLY with valid JSON in this exact format:
-{{
+{
   "overall_summary": "...",
   "top_pick": "Plan Name by Provider",
   "ranked_plans": [
-    {{
+    {
       "rank": 1,
       "plan_name": "...",
       "provider": "...",
@@ -80,16 +78,154 @@ Respond ONLY with valid JSON in this exact format:
       "cons": ["...", "..."],
       "within_budget": true,
       "claim_settlement_ratio": 99.5
-    }}
+    }
   ]
-}}
+}
 """
 
 
-def analyze_plans(user_inputs: Dict[str, Any], plans: List[Dict]) -> Dict:
+def _user_profile_text(user: Dict) -> str:
+    return f"""USER PROFILE:
+- Age: {user['age']} years
+- Desired Sum Assured: ₹{user['sum_assured']} Lakhs
+- Maximum Annual Premium Budget: ₹{user['premium_budget']}
+- Desired Policy Term: {user['policy_term']} years
+- Minimum Claim Settlement Ratio preferred: {user['min_csr']}%"""
+
+
+def _build_prompt(user: Dict, plans: List[Dict]) -> str:
+    plans_text = json.dumps(plans, indent=2)
+    return f"""
+{_ADVISOR_ROLE}
+
+{_user_profile_text(user)}
+
+AVAILABLE PLANS (filtered for this user's age):
+{plans_text}
+
+{_RANKING_INSTRUCTIONS}"""
+
+
+def _build_cached_prompt(user: Dict, plans: List[Dict]) -> str:
+    """Per-request prompt used with the cached plans catalog."""
+    names = "\n".join(f"- {p['plan_name']} ({p['provider']})" for p in plans)
+    return f"""
+{_user_profile_text(user)}
+
+AVAILABLE PLANS: only the following plans from the catalog are open to this user's age. Ignore all others.
+{names}
+
+{_RANKING_INSTRUCTIONS}"""
+
+
+def _plan_summary(p: Dict) -> Dict:
+    """Relevant plan fields for the prompt."""
+    return {
+        "plan_name": p["plan_name"],
+        "provider": p["provider"],
+        "premium_annual": p["premium_annual"],
+        "sum_assured_min_lakhs": p["sum_assured_min"],
+        "sum_assured_max_lakhs": p["sum_assured_max"],
+        "policy_term_min": p["policy_term_min"],
+        "policy_term_max": p["policy_term_max"],
+        "claim_settlement_ratio": p["claim_settlement_ratio"],
+        "key_features": p.get("key_features", "").split("|"),
+    }
+
+
+# ── Explicit context caching ─────────────────────────────────────────────────
+# The plans catalog is the bulk of every recommend prompt and only changes when
+# plans change, so it is uploaded once as Gemini cached content and requests
+# send just the user profile. If caching is unavailable (catalog below the
+# model's minimum cacheable size, no API key, ...) the full prompt is used.
+
+_CATALOG_CACHE_TTL = timedelta(hours=1)
+_CATALOG_RETRY_MIN = 60        # seconds before retrying a failed cache creation
+_CATALOG_RETRY_MAX = 1800
+_catalog_cache = None          # genai.caching.CachedContent for _catalog_key
+_catalog_key = ""
+_catalog_too_small = False     # permanent: catalog below the model's minimum cacheable size
+_catalog_creating = False      # a thread is creating the cache; others send full prompts meanwhile
+_catalog_retry_at = 0.0
+_catalog_backoff = _CATALOG_RETRY_MIN
+_catalog_lock = threading.Lock()
+
+
+def _is_too_small_for_cache(error: Exception) -> bool:
+    msg = str(error).lower()
+    return "too small" in msg or "min_total_token_count" in msg
+
+
+def _is_quota_error(error: Exception) -> bool:
+    msg = str(error)
+    return "429" in msg or "quota" in msg.lower()
+
+
+def _get_catalog_cache(plans: List[Dict], catalog_key: str):
+    """
+    Return cached content holding this plans catalog, creating it if needed.
+    catalog_key identifies the plans (the snapshot hash), so the catalog text
+    is only built when a cache actually has to be created. The create call is
+    made outside the lock; superseded caches are left to expire on their TTL
+    since in-flight requests may still be using them.
+    """
+    global _catalog_cache, _catalog_key, _catalog_too_small, _catalog_creating
+    global _catalog_retry_at, _catalog_backoff
+
+    with _catalog_lock:
+        now = time.monotonic()
+        if catalog_key == _catalog_key:
+            if _catalog_cache is not None:
+                if _catalog_cache.expire_time > datetime.now(timezone.utc) + timedelta(minutes=1):
+                    return _catalog_cache
+            elif _catalog_too_small or now < _catalog_retry_at:
+                return None
+        else:
+            _catalog_cache = None
+            _catalog_key = catalog_key
+            _catalog_too_small = False
+            _catalog_retry_at = 0.0
+            _catalog_backoff = _CATALOG_RETRY_MIN
+        if _catalog_creating:
+            return None
+        _catalog_creating = True
+
+    cache, error = None, None
+    try:
+        catalog_text = json.dumps([_plan_summary(p) for p in plans], indent=2)
+        cache = genai.caching.CachedContent.create(
+            model=_model.model_name,
+            display_name="term-insurance-plans-catalog",
+            system_instruction=_ADVISOR_ROLE,
+            contents=[f"TERM INSURANCE PLANS CATALOG:\n{catalog_text}"],
+            ttl=_CATALOG_CACHE_TTL,
+        )
+        logger.info(f"Created Gemini context cache {cache.name} for {len(plans)} plans")
+    except Exception as e:
+        error = e
+
+    with _catalog_lock:
+        _catalog_creating = False
+        if catalog_key != _catalog_key:
+            return cache  # plans changed meanwhile; usable for this request only
+        _catalog_cache = cache
+        if error is None:
+            _catalog_backoff = _CATALOG_RETRY_MIN
+        elif _is_too_small_for_cache(error):
+            _catalog_too_small = True
+            logger.info(f"Plans catalog too small to cache ({error}). Sending full prompts.")
+        else:
+            _catalog_retry_at = time.monotonic() + _catalog_backoff
+            logger.warning(f"Plans catalog cache creation failed ({error}). Retrying in {_catalog_backoff}s.")
+            _catalog_backoff = min(_catalog_backoff * 2, _CATALOG_RETRY_MAX)
+        return cache
+
+
+def analyze_plans(user_inputs: Dict[str, Any], plans: List[Dict], plans_hash: Optional[str] = None) -> Dict:
     """
     Send user inputs + plans to Gemini and return structured recommendation.
     Falls back to a simple sort-based recommendation if Gemini is unavailable.
+    plans_hash identifies the plans for context caching; computed if omitted.
     """
     if not plans:
         return {
@@ -106,25 +242,35 @@ def analyze_plans(user_inputs: Dict[str, Any], plans: List[Dict]) -> Dict:
     if not eligible:
         eligible = plans  # fallback: use all
 
+    # Preferred path: full catalog in cached context, only the profile sent per request
+    if plans_hash is None:
+        plans_hash = hashlib.sha256(json.dumps(plans, sort_keys=True, default=str).encode()).hexdigest()
+    cache = _get_catalog_cache(plans, plans_hash)
+    quota_error = None
+    if cache is not None:
+        try:
+            cached_model = genai.GenerativeModel.from_cached_content(cached_content=cache)
+            response = cached_model.generate_content(_build_cached_prompt(user_inputs, eligible))
+            logger.info(f"Gemini cached tokens used: {response.usage_metadata.cached_content_token_count}")
+            raw = response.text.strip()
+            json_match = re.search(r"\{.*\}", raw, re.DOTALL)
+            if json_match:
+                return json.loads(json_match.group())
+            return json.loads(raw)
+        except Exception as e:
+            # Out of quota on the primary model: go straight to the fallback models
+            if _is_quota_error(e):
+                quota_error = e
+            logger.warning(f"Cached-context request failed ({e}). Falling back to full prompt.")
+
     # Build plan dicts for the prompt (only relevant fields)
-    plan_summaries = [
-        {
-            "plan_name": p["plan_name"],
-            "provider": p["provider"],
-            "premium_annual": p["premium_annual"],
-            "sum_assured_min_lakhs": p["sum_assured_min"],
-            "sum_assured_max_lakhs": p["sum_assured_max"],
-            "policy_term_min": p["policy_term_min"],
-            "policy_term_max": p["policy_term_max"],
-            "claim_settlement_ratio": p["claim_settlement_ratio"],
-            "key_features": p.get("key_features", "").split("|"),
-        }
-        for p in eligible
-    ]
+    plan_summaries = [_plan_summary(p) for p in eligible]
 
     prompt = _build_prompt(user_inputs, plan_summaries)
 
     try:
+        if quota_error is not None:
+            raise quota_error
         active_model = _model
         response = active_model.generate_content(prompt)
         raw = response.text.strip()
@@ -137,7 +283,7 @@ def analyze_plans(user_inputs: Dict[str, Any], plans: List[Dict]) -> Dict:
 
     except Exception as e:
         # On quota/rate-limit, try other models automatically
-        if "429" in str(e) or "quota" in str(e).lower() or "404" in str(e):
+        if _is_quota_error(e) or "404" in str(e):
             logger.warning(f"Primary model failed ({e}). Trying fallback models...")
             for model_name in _MODEL_FALLBACKS[1:]:
                 try:
@@ -190,7 +336,7 @@ def _fallback_ranking(user_inputs: Dict, plans: List[Dict]) -> Dict:
         )
 
     top = sorted_plans[0] if sorted_plans else {}
-    return {
+    return FallbackResult({
         "overall_summary": (
             f"Based on rule-based analysis (Gemini unavailable), "
             f"'{top.get('plan_name', 'N/A')}' by {top.get('provider', 'N/A')} "
@@ -199,7 +345,7 @@ def _fallback_ranking(user_inputs: Dict, plans: List[Dict]) -> Dict:
         ),
         "top_pick": f"{top.get('plan_name', 'N/A')} by {top.get('provider', 'N/A')}",
         "ranked_plans": ranked,
-    }
+    })
 
 
 def _normalize_compare_keys(comparison_table: list, plan_names: list) -> list:
@@ -290,12 +436,12 @@ Include aspects: Claim Settlement Ratio, Annual Premium (approx. for ₹{user_pr
         return result
     except Exception as e:
         logger.warning(f"Compare failed: {e}")
-        return {
+        return FallbackResult({
             "verdict": "Comparison unavailable. Please check your API key.",
             "winner": plans[0]["plan_name"] if plans else "N/A",
             "comparison_table": [],
             "detailed_comparison": [],
-        }
+        })
 
 
 def chat_with_advisor(message: str, user_profile: Dict, top_plans: List[Dict]) -> str:
@@ -351,7 +497,7 @@ Respond ONLY with valid JSON:
         # Rule-based fallback
         base = 0.0006 + max(0, age - 25) * 0.00003
         annual = base * sum_assured * 100000
-        return {
+        return FallbackResult({
             "min_premium": int(annual * 0.7),
             "max_premium": int(annual * 1.4),
             "typical_premium": int(annual),
@@ -361,4 +507,4 @@ Respond ONLY with valid JSON:
                 f"{policy_term} year term",
             ],
             "tip": "Buying at a younger age and maintaining a healthy lifestyle significantly reduces your premium.",
-        }
+        })
@@ -1,21 +1,35 @@
 """
 FastAPI backend for Term Insurance Analyzer.
 """
+import asyncio
+import hashlib
+import json
 import logging
 import os
+import threading
+import time
 from contextlib import asynccontextmanager
 from typing import List, Optional
 
-from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks
+import orjson
+from cachetools import TTLCache
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel, Field
-from sqlalchemy import func
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import func, insert, select
 from sqlalchemy.orm import Session
 
-from database import init_db, get_db, InsurancePlan
-from gemini_analyzer import analyze_plans, compare_specific_plans, chat_with_advisor, estimate_premium_range
-from scraper.scheduler import run_scrape_job, start_scheduler
+from database import init_db, get_db, engine, InsurancePlan, SessionLocal, bump_plans_version, get_plans_version
+from schemas import (
+    PlanOut, PlanCreate, PlanUpdate, RecommendRequest, RecommendResponse,
+    CompareRequest, ChatRequest, PremiumEstimateRequest,
+)
+from gemini_analyzer import (
+    FallbackResult, analyze_plans, compare_specific_plans, chat_with_advisor, estimate_premium_range,
+)
+from scraper.scheduler import run_scrape_job, start_scheduler, on_scrape_complete, trigger_scrape_now
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,12 +37,18 @@ logger = logging.getLogger(__name__)
 scheduler = None
 
 
+def _log_pool_status():
+    logger.info(f"DB pool: {engine.pool.status()}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     global scheduler
     init_db()
+    on_scrape_complete(_refresh_plans_snapshot)
     run_scrape_job()          # seed + scrape on startup
     scheduler = start_scheduler()
+    scheduler.add_job(_log_pool_status, "interval", minutes=1, id="db_pool_status", replace_existing=True)
     yield
     if scheduler:
         scheduler.shutdown(wait=False)
@@ -51,427 +71,326 @@ app.add_middleware(
     allow_credentials=False if "*" in _allowed_origins else True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count"],
 )
 
 
-# ── Pydantic schemas ──────────────────────────────────────────────────────────
-
-class PlanOut(BaseModel):
-    id: int
-    plan_name: str
-    provider: str
-    source: str
-    sum_assured_min: float
-    sum_assured_max: float
-    premium_annual: float
-    policy_term_min: int
-    policy_term_max: int
-    age_min: int
-    age_max: int
-    claim_settlement_ratio: float
-    key_features: str
-    source_url: str
-
-    class Config:
-        from_attributes = True
-
-
-class PlanCreate(BaseModel):
-    plan_name: str = Field(..., min_length=2)
-    provider: str = Field(..., min_length=2)
-    sum_assured_min: float = Field(..., gt=0, description="Min sum assured in Lakhs")
-    sum_assured_max: float = Field(..., gt=0, description="Max sum assured in Lakhs")
-    premium_annual: float = Field(..., gt=0, description="Annual premium in INR")
-    policy_term_min: int = Field(..., ge=1, le=50)
-    policy_term_max: int = Field(..., ge=1, le=60)
-    age_min: int = Field(18, ge=1, le=99)
-    age_max: int = Field(65, ge=1, le=99)
-    claim_settlement_ratio: float = Field(..., ge=0, le=100)
-    key_features: str = Field("", description="Pipe-separated features e.g. 'Feature 1|Feature 2'")
-    source_url: str = Field("", description="Official plan URL")
-
-
-class PlanUpdate(BaseModel):
-    plan_name: Optional[str] = None
-    provider: Optional[str] = None
-    sum_assured_min: Optional[float] = None
-    sum_assured_max: Optional[float] = None
-    premium_annual: Optional[float] = None
-    policy_term_min: Optional[int] = None
-    policy_term_max: Optional[int] = None
-    age_min: Optional[int] = None
-    age_max: Optional[int] = None
-    claim_settlement_ratio: Optional[float] = None
-    key_features: Optional[str] = None
-    source_url: Optional[str] = None
-
-
-class RecommendRequest(BaseModel):
-    age: int = Field(..., ge=18, le=70, description="User's current age")
-    sum_assured: float = Field(..., gt=0, description="Desired sum assured in Lakhs")
-    premium_budget: float = Field(..., gt=0, description="Max annual premium in INR")
-    policy_term: int = Field(..., ge=5, le=50, description="Desired policy term in years")
-    min_csr: float = Field(95.0, ge=0, le=100, description="Minimum claim settlement ratio %")
-
-
-class RecommendResponse(BaseModel):
-    overall_summary: str
-    top_pick: str
-    ranked_plans: list
-    total_plans_analyzed: int
-
-
-class CompareRequest(BaseModel):
-    plan_names: List[str] = Field(..., description="2–3 plan names to compare")
-    user_profile: RecommendRequest
-
-
-class ChatRequest(BaseModel):
-    message: str = Field(..., min_length=1, max_length=1000)
-    user_profile: Optional[dict] = None
-    top_plans: Optional[list] = None
-
-
-class PremiumEstimateRequest(BaseModel):
-    age: int = Field(..., ge=18, le=70)
-    sum_assured: float = Field(..., gt=0, description="Sum assured in Lakhs")
-    policy_term: int = Field(..., ge=5, le=50)
+# ── Column sets ───────────────────────────────────────────────────────────────
+# Read endpoints select only the columns they need and get plain row mappings
+# back, skipping ORM object construction.
+
+_SNAPSHOT_COLUMNS = (
+    InsurancePlan.plan_name,
+    InsurancePlan.provider,
+    InsurancePlan.source,
+    InsurancePlan.sum_assured_min,
+    InsurancePlan.sum_assured_max,
+    InsurancePlan.premium_annual,
+    InsurancePlan.policy_term_min,
+    InsurancePlan.policy_term_max,
+    InsurancePlan.age_min,
+    InsurancePlan.age_max,
+    InsurancePlan.claim_settlement_ratio,
+    InsurancePlan.key_features,
+)
 
+_PLAN_COLUMNS = (InsurancePlan.id, *_SNAPSHOT_COLUMNS, InsurancePlan.source_url)
 
-# ── Endpoints ────────────────────────────────────────────────────────────────
 
-@app.get("/api/health")
-def health():
-    return {"status": "ok", "message": "Term Insurance Analyzer API is running", "version": "2.0.0"}
+# ── Plans snapshot ────────────────────────────────────────────────────────────
+# The analyzer endpoints work on plain dicts of every plan. They are built once
+# whenever the plans table changes (scrape finished, manual edit) and shared by
+# all requests together with a hash of their contents. Endpoints that call
+# Gemini read only this snapshot and take no DB session, so no pooled
+# connection sits idle for the seconds an LLM call takes.
+# With several uvicorn workers a write lands in one process only, so every
+# worker also polls the plans_version row (at most once per
+# PLANS_VERSION_CHECK_SECONDS) and rebuilds when another worker bumped it.
 
+PLANS_VERSION_CHECK_SECONDS = float(os.getenv("PLANS_VERSION_CHECK_SECONDS", "2"))
 
-@app.get("/api/plans", response_model=List[PlanOut])
-def get_plans(
-    source: Optional[str] = None,
-    min_csr: Optional[float] = None,
-    search: Optional[str] = None,
-    db: Session = Depends(get_db),
-):
-    """List all stored insurance plans with optional filters."""
-    query = db.query(InsurancePlan)
-    if source:
-        query = query.filter(InsurancePlan.source == source)
-    if min_csr is not None:
-        query = query.filter(InsurancePlan.claim_settlement_ratio >= min_csr)
-    if search:
-        term = f"%{search}%"
-        query = query.filter(
-            (InsurancePlan.plan_name.ilike(term)) |
-            (InsurancePlan.provider.ilike(term))
-        )
-    plans = query.order_by(InsurancePlan.claim_settlement_ratio.desc()).all()
-    return plans
+_PLANS_SNAPSHOT: tuple[tuple[dict, ...], str] = ((), "")
+_snapshot_version: Optional[int] = None
+_snapshot_checked_at = 0.0
+_snapshot_lock = threading.RLock()
 
 
-@app.post("/api/recommend", response_model=RecommendResponse)
-def recommend(req: RecommendRequest, db: Session = Depends(get_db)):
-    """Analyze plans for the given user profile using Gemini AI."""
-    plans = db.query(InsurancePlan).all()
-    if not plans:
-        raise HTTPException(
-            status_code=404,
-            detail="No plans in database. Trigger /api/scrape first.",
-        )
+def _refresh_plans_snapshot():
+    """Rebuild the plans snapshot from the DB and drop cached AI responses."""
+    global _PLANS_SNAPSHOT, _snapshot_version, _snapshot_checked_at
+    with SessionLocal() as db:
+        version = get_plans_version(db)
+        rows = db.execute(select(*_PLAN_COLUMNS).order_by(InsurancePlan.id)).mappings().all()
+    # Hash every API-visible column so the hash also works as the HTTP ETag
+    blob = json.dumps([dict(row) for row in rows], default=str)
+    plans_data = tuple({col.key: row[col.key] for col in _SNAPSHOT_COLUMNS} for row in rows)
+    plans_hash = hashlib.sha256(blob.encode()).hexdigest()
+    with _snapshot_lock:
+        _PLANS_SNAPSHOT = (plans_data, plans_hash)
+        _snapshot_version = version
+        _snapshot_checked_at = time.monotonic()
+    with _cache_lock:
+        _response_cache.clear()
 
-    plans_data = [
-        {
-            "plan_name": p.plan_name,
-            "provider": p.provider,
-            "source": p.source,
-            "sum_assured_min": p.sum_assured_min,
-            "sum_assured_max": p.sum_assured_max,
-            "premium_annual": p.premium_annual,
-            "policy_term_min": p.policy_term_min,
-            "policy_term_max": p.policy_term_max,
-            "age_min": p.age_min,
-            "age_max": p.age_max,
-            "claim_settlement_ratio": p.claim_settlement_ratio,
-            "key_features": p.key_features,
-        }
-        for p in plans
-    ]
 
-    result = analyze_plans(req.model_dump(), plans_data)
+def _get_plans_snapshot() -> tuple[tuple[dict, ...], str]:
+    """Return (plans_data, plans_hash), rebuilding it if the plans changed."""
+    global _snapshot_checked_at
+    with _snapshot_lock:
+        if not _PLANS_SNAPSHOT[1]:
+            _refresh_plans_snapshot()
+        elif time.monotonic() - _snapshot_checked_at >= PLANS_VERSION_CHECK_SECONDS:
+            with SessionLocal() as db:
+                version = get_plans_version(db)
+            if version != _snapshot_version:
+                _refresh_plans_snapshot()
+            _snapshot_checked_at = time.monotonic()
+        return _PLANS_SNAPSHOT
 
-    return RecommendResponse(
-        overall_summary=result.get("overall_summary", ""),
-        top_pick=result.get("top_pick", ""),
-        ranked_plans=result.get("ranked_plans", []),
-        total_plans_analyzed=len(plans_data),
-    )
 
+# ── AI response cache ─────────────────────────────────────────────────────────
+# Gemini calls take seconds, so identical requests against an unchanged plans
+# snapshot are answered from memory. Keys embed the snapshot hash. Rule-based
+# fallbacks (FallbackResult) are never cached, so a Gemini outage isn't pinned.
 
-@app.post("/api/compare")
-def compare_plans_endpoint(req: CompareRequest, db: Session = Depends(get_db)):
-    """Compare selected plans side-by-side using Gemini AI."""
-    plans = db.query(InsurancePlan).all()
-    plans_data = [
-        {
-            "plan_name": p.plan_name,
-            "provider": p.provider,
-            "sum_assured_min": p.sum_assured_min,
-            "sum_assured_max": p.sum_assured_max,
-            "premium_annual": p.premium_annual,
-            "policy_term_min": p.policy_term_min,
-            "policy_term_max": p.policy_term_max,
-            "age_min": p.age_min,
-            "age_max": p.age_max,
-            "claim_settlement_ratio": p.claim_settlement_ratio,
-            "key_features": p.key_features,
-        }
-        for p in plans
-    ]
-    selected = [p for p in plans_data if p["plan_name"] in req.plan_names]
-    if len(selected) < 2:
-        raise HTTPException(status_code=400, detail="Need at least 2 matching plans to compare")
-    return compare_specific_plans(req.user_profile.model_dump(), selected)
+_response_cache: TTLCache = TTLCache(maxsize=1024, ttl=3600)
+_cache_lock = threading.Lock()
 
 
-@app.post("/api/chat")
-def chat_endpoint(req: ChatRequest):
-    """Ask follow-up questions to the AI insurance advisor."""
-    reply = chat_with_advisor(req.message, req.user_profile or {}, req.top_plans or [])
-    return {"reply": reply}
+def _cache_key(endpoint: str, req: dict, plans_hash: str = "") -> str:
+    blob = json.dumps({"endpoint": endpoint, "req": req, "plans_hash": plans_hash}, sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()
 
 
-@app.post("/api/premium-estimate")
-def premium_estimate(req: PremiumEstimateRequest):
-    """Estimate premium range for given age, coverage, and term."""
-    return estimate_premium_range(req.age, req.sum_assured, req.policy_term)
+def _cache_get(key: str):
+    with _cache_lock:
+        return _response_cache.get(key)
 
 
-@app.post("/api/scrape")
-def trigger_scrape(background_tasks: BackgroundTasks):
-    """Manually trigger a fresh scrape in the background."""
-    background_tasks.add_task(run_scrape_job)
-    return {"message": "Scrape job started in background. Check /api/plans in ~30s."}
+def _cache_set(key: str, value):
+    with _cache_lock:
+        _response_cache[key] = value
 
 
-@app.get("/api/stats")
-def stats(db: Session = Depends(get_db)):
-    """Return DB statistics."""
-    total = db.query(InsurancePlan).count()
-    source_counts = (
-        db.query(InsurancePlan.source, func.count(InsurancePlan.id))
-        .group_by(InsurancePlan.source)
-        .all()
-    )
-    avg_csr = db.query(func.avg(InsurancePlan.claim_settlement_ratio)).scalar() or 0
-    return {
-        "total_plans": total,
-        "sources": {s: c for s, c in source_counts},
-        "avg_claim_settlement_ratio": round(float(avg_csr), 2),
-    }
+# ── Gemini calls ──────────────────────────────────────────────────────────────
+# gemini_analyzer is blocking, so AI endpoints are async and hand each call to
+# the threadpool. The semaphore caps concurrent outbound Gemini requests so a
+# burst cannot take every threadpool worker away from the DB endpoints.
 
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+_gemini_semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
 
-# ── Manual CRUD endpoints ─────────────────────────────────────────────────────
 
-@app.post("/api/plans", response_model=PlanOut, status_code=201)
-def create_plan(plan: PlanCreate, db: Session = Depends(get_db)):
-    """Manually add a new insurance plan."""
-    new_plan = InsurancePlan(**plan.model_dump(), source="manual")
-    db.add(new_plan)
-    db.commit()
-    db.refresh(new_plan)
-    return new_plan
+async def _call_gemini(func, *args):
+    async with _gemini_semaphore:
+        return await run_in_threadpool(func, *args)
 
 
-@app.put("/api/plans/{plan_id}", response_model=PlanOut)
-def update_plan(plan_id: int, updates: PlanUpdate, db: Session = Depends(get_db)):
-    """Update an existing insurance plan."""
-    plan = db.query(InsurancePlan).filter(InsurancePlan.id == plan_id).first()
-    if not plan:
-        raise HTTPException(status_code=404, detail="Plan not found")
-    for field, value in updates.model_dump(exclude_none=True).items():
-        setattr(plan, field, value)
-    db.commit()
-    db.refresh(plan)
-    return plan
+def _scalar_fields(model) -> dict:
+    """
+    Plain dict of a request model's fields. The AI request schemas hold only
+    scalars, so a copy of the instance __dict__ equals model_dump() at a
+    fraction of the cost.
+    """
+    return dict(model.__dict__)
 
 
-@app.delete("/api/plans/{plan_id}")
-def delete_plan(plan_id: int, db: Session = Depends(get_db)):
-    """Delete an insurance plan."""
-    plan = db.query(InsurancePlan).filter(InsurancePlan.id == plan_id).first()
-    if not plan:
-        raise HTTPException(status_code=404, detail="Plan not found")
-    db.delete(plan)
-    db.commit()
-    return {"message": f"Plan '{plan.plan_name}' deleted successfully"}
+# ── HTTP caching ──────────────────────────────────────────────────────────────
+# Plan listings and stats only change with the plans snapshot, so its hash is
+# a strong ETag. Clients revalidate on every use (no-cache), so edits show up
+# immediately, and an unchanged snapshot costs only an empty 304.
 
+_ETAG_CACHE_CONTROL = "public, no-cache"
 
-@app.get("/api/plans/{plan_id}", response_model=PlanOut)
-def get_plan(plan_id: int, db: Session = Depends(get_db)):
-    """Get a single plan by ID."""
-    plan = db.query(InsurancePlan).filter(InsurancePlan.id == plan_id).first()
-    if not plan:
-        raise HTTPException(status_code=404, detail="Plan not found")
-    return plan
 
+def _is_snapshot_cached_path(path: str) -> bool:
+    return path == "/api/stats" or path == "/api/plans" or path.startswith("/api/plans/")
 
-# ── Serve built React frontend (production) ───────────────────────────────────
-
-_frontend_dist = os.path.join(os.path.dirname(__file__), "..", "frontend", "dist")
-if os.path.isdir(_frontend_dist):
-    app.mount("/", StaticFiles(directory=_frontend_dist, html=True), name="static")
 
+@app.middleware("http")
+async def snapshot_etag(request: Request, call_next):
+    if request.method != "GET" or not _is_snapshot_cached_path(request.url.path):
+        return await call_next(request)
 
+    _, plans_hash = await run_in_threadpool(_get_plans_snapshot)
+    etag = f'"{plans_hash}"'
+    headers = {"ETag": etag, "Cache-Control": _ETAG_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
 
-# ── Pydantic schemas ──────────────────────────────────────────────────────────
-
-class PlanOut(BaseModel):
-    id: int
-    plan_name: str
-    provider: str
-    source: str
-    sum_assured_min: float
-    sum_assured_max: float
-    premium_annual: float
-    policy_term_min: int
-    policy_term_max: int
-    age_min: int
-    age_max: int
-    claim_settlement_ratio: float
-    key_features: str
-    source_url: str
-
-    class Config:
-        from_attributes = True
-
-
-class PlanCreate(BaseModel):
-    plan_name: str = Field(..., min_length=2)
-    provider: str = Field(..., min_length=2)
-    sum_assured_min: float = Field(..., gt=0, description="Min sum assured in Lakhs")
-    sum_assured_max: float = Field(..., gt=0, description="Max sum assured in Lakhs")
-    premium_annual: float = Field(..., gt=0, description="Annual premium in INR")
-    policy_term_min: int = Field(..., ge=1, le=50)
-    policy_term_max: int = Field(..., ge=1, le=60)
-    age_min: int = Field(18, ge=1, le=99)
-    age_max: int = Field(65, ge=1, le=99)
-    claim_settlement_ratio: float = Field(..., ge=0, le=100)
-    key_features: str = Field("", description="Pipe-separated features e.g. 'Feature 1|Feature 2'")
-    source_url: str = Field("", description="Official plan URL")
-
-
-class PlanUpdate(BaseModel):
-    plan_name: Optional[str] = None
-    provider: Optional[str] = None
-    sum_assured_min: Optional[float] = None
-    sum_assured_max: Optional[float] = None
-    premium_annual: Optional[float] = None
-    policy_term_min: Optional[int] = None
-    policy_term_max: Optional[int] = None
-    age_min: Optional[int] = None
-    age_max: Optional[int] = None
-    claim_settlement_ratio: Optional[float] = None
-    key_features: Optional[str] = None
-    source_url: Optional[str] = None
-
-
-
-class RecommendRequest(BaseModel):
-    age: int = Field(..., ge=18, le=70, description="User's current age")
-    sum_assured: float = Field(..., gt=0, description="Desired sum assured in Lakhs")
-    premium_budget: float = Field(..., gt=0, description="Max annual premium in INR")
-    policy_term: int = Field(..., ge=5, le=50, description="Desired policy term in years")
-    min_csr: float = Field(95.0, ge=0, le=100, description="Minimum claim settlement ratio %")
-
-
-class RecommendResponse(BaseModel):
-    overall_summary: str
-    top_pick: str
-    ranked_plans: list
-    total_plans_analyzed: int
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers.update(headers)
+    return response
 
 
 # ── Endpoints ────────────────────────────────────────────────────────────────
 
 @app.get("/api/health")
 def health():
-    return {"status": "ok", "message": "Term Insurance Analyzer API is running"}
+    return {"status": "ok", "message": "Term Insurance Analyzer API is running", "version": "2.0.0"}
 
 
 @app.get("/api/plans", response_model=List[PlanOut])
 def get_plans(
     source: Optional[str] = None,
     min_csr: Optional[float] = None,
-    db: Session = Depends(get_db),
+    search: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
 ):
-    """List all stored insurance plans with optional filters."""
-    query = db.query(InsurancePlan)
+    """List stored insurance plans with optional filters, one page at a time."""
+    stmt = select(*_PLAN_COLUMNS)
     if source:
-        query = query.filter(InsurancePlan.source == source)
+        stmt = stmt.where(InsurancePlan.source == source)
     if min_csr is not None:
-        query = query.filter(InsurancePlan.claim_settlement_ratio >= min_csr)
-    plans = query.order_by(InsurancePlan.claim_settlement_ratio.desc()).all()
-    return plans
+        stmt = stmt.where(InsurancePlan.claim_settlement_ratio >= min_csr)
+    if search:
+        term = f"%{search}%"
+        stmt = stmt.where(
+            (InsurancePlan.plan_name.ilike(term)) |
+            (InsurancePlan.provider.ilike(term))
+        )
+
+    if source or min_csr is not None or search:
+        # Short-lived session so the stream below is the only connection held.
+        with SessionLocal() as db:
+            total = db.execute(select(func.count()).select_from(stmt.subquery())).scalar_one()
+    else:
+        total = len(_get_plans_snapshot()[0])
+
+    stmt = (
+        stmt.order_by(InsurancePlan.claim_settlement_ratio.desc(), InsurancePlan.id)
+        .limit(limit)
+        .offset(offset)
+        .execution_options(yield_per=200)
+    )
+
+    def stream():
+        # One chunk per yield_per partition keeps threadpool hops per batch, not per row.
+        with SessionLocal() as stream_db:
+            yield b"["
+            sep = b""
+            for partition in stream_db.execute(stmt).mappings().partitions():
+                yield sep + b",".join(orjson.dumps(dict(row)) for row in partition)
+                sep = b","
+            yield b"]"
+
+    return StreamingResponse(
+        stream(),
+        media_type="application/json",
+        headers={"X-Total-Count": str(total)},
+    )
 
 
 @app.post("/api/recommend", response_model=RecommendResponse)
-def recommend(req: RecommendRequest, db: Session = Depends(get_db)):
+async def recommend(req: RecommendRequest):
     """Analyze plans for the given user profile using Gemini AI."""
-    plans = db.query(InsurancePlan).all()
-    if not plans:
+    plans_data, plans_hash = await run_in_threadpool(_get_plans_snapshot)
+    if not plans_data:
         raise HTTPException(
             status_code=404,
             detail="No plans in database. Trigger /api/scrape first.",
         )
 
-    # Serialize plans to dicts for the analyzer
-    plans_data = [
-        {
-            "plan_name": p.plan_name,
-            "provider": p.provider,
-            "source": p.source,
-            "sum_assured_min": p.sum_assured_min,
-            "sum_assured_max": p.sum_assured_max,
-            "premium_annual": p.premium_annual,
-            "policy_term_min": p.policy_term_min,
-            "policy_term_max": p.policy_term_max,
-            "age_min": p.age_min,
-            "age_max": p.age_max,
-            "claim_settlement_ratio": p.claim_settlement_ratio,
-            "key_features": p.key_features,
-        }
-        for p in plans
-    ]
+    profile = _scalar_fields(req)
+    key = _cache_key("recommend", profile, plans_hash)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
 
-    result = analyze_plans(req.model_dump(), plans_data)
+    result = await _call_gemini(analyze_plans, profile, plans_data, plans_hash)
 
-    return RecommendResponse(
+    response = RecommendResponse(
         overall_summary=result.get("overall_summary", ""),
         top_pick=result.get("top_pick", ""),
         ranked_plans=result.get("ranked_plans", []),
         total_plans_analyzed=len(plans_data),
     )
+    if not isinstance(result, FallbackResult):
+        _cache_set(key, response)
+    return response
+
+
+@app.post("/api/compare")
+async def compare_plans_endpoint(req: CompareRequest):
+    """Compare selected plans side-by-side using Gemini AI."""
+    wanted = set(req.plan_names)
+    if len(wanted) < 2:
+        raise HTTPException(status_code=400, detail="Need at least 2 matching plans to compare")
+
+    plans_data, plans_hash = await run_in_threadpool(_get_plans_snapshot)
+    selected = [
+        {k: v for k, v in p.items() if k != "source"}
+        for p in plans_data
+        if p["plan_name"] in wanted
+    ]
+    if len(selected) < 2:
+        raise HTTPException(status_code=400, detail="Need at least 2 matching plans to compare")
+
+    profile = _scalar_fields(req.user_profile)
+    key = _cache_key("compare", {"plan_names": req.plan_names, "user_profile": profile}, plans_hash)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+    result = await _call_gemini(compare_specific_plans, profile, selected)
+    if not isinstance(result, FallbackResult):
+        _cache_set(key, result)
+    return result
+
+
+@app.post("/api/chat")
+async def chat_endpoint(req: ChatRequest):
+    """Ask follow-up questions to the AI insurance advisor."""
+    profile = _scalar_fields(req.user_profile) if req.user_profile else {}
+    reply = await _call_gemini(chat_with_advisor, req.message, profile, req.top_plans or [])
+    return {"reply": reply}
+
+
+@app.post("/api/premium-estimate")
+async def premium_estimate(req: PremiumEstimateRequest):
+    """Estimate premium range for given age, coverage, and term."""
+    key = _cache_key("premium-estimate", _scalar_fields(req))
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+    result = await _call_gemini(estimate_premium_range, req.age, req.sum_assured, req.policy_term)
+    if not isinstance(result, FallbackResult):
+        _cache_set(key, result)
+    return result
 
 
 @app.post("/api/scrape")
-def trigger_scrape(background_tasks: BackgroundTasks):
+def trigger_scrape():
     """Manually trigger a fresh scrape in the background."""
-    background_tasks.add_task(run_scrape_job)
+    if scheduler is None:
+        raise HTTPException(status_code=503, detail="Scheduler is not running")
+    if not trigger_scrape_now(scheduler):
+        return {"message": "A scrape is already running. Check /api/plans in ~30s."}
     return {"message": "Scrape job started in background. Check /api/plans in ~30s."}
 
 
 @app.get("/api/stats")
 def stats(db: Session = Depends(get_db)):
     """Return DB statistics."""
-    total = db.query(InsurancePlan).count()
-    sources = (
-        db.query(InsurancePlan.source, db.query(InsurancePlan).filter(
-            InsurancePlan.source == InsurancePlan.source).count())
-        .distinct()
-        .all()
-    )
+    stmt = select(
+        InsurancePlan.source,
+        func.count(InsurancePlan.id),
+        func.count(InsurancePlan.claim_settlement_ratio),
+        func.avg(InsurancePlan.claim_settlement_ratio),
+    ).group_by(InsurancePlan.source)
+
+    sources, total, csr_count, csr_sum = {}, 0, 0, 0.0
+    for source, count, source_csr_count, source_avg_csr in db.execute(stmt):
+        sources[source] = count
+        total += count
+        csr_count += source_csr_count
+        csr_sum += float(source_avg_csr or 0) * source_csr_count
+    avg_csr = csr_sum / csr_count if csr_count else 0
     return {
         "total_plans": total,
-        "sources": [s[0] for s in sources],
+        "sources": sources,
+        "avg_claim_settlement_ratio": round(avg_csr, 2),
     }
 
 
@@ -482,11 +401,28 @@ def create_plan(plan: PlanCreate, db: Session = Depends(get_db)):
     """Manually add a new insurance plan."""
     new_plan = InsurancePlan(**plan.model_dump(), source="manual")
     db.add(new_plan)
+    bump_plans_version(db)
     db.commit()
     db.refresh(new_plan)
+    _refresh_plans_snapshot()
     return new_plan
 
 
+_BULK_CHUNK_SIZE = 1000
+
+
+@app.post("/api/plans/bulk", status_code=201)
+def create_plans_bulk(plans: List[PlanCreate], db: Session = Depends(get_db)):
+    """Manually add many plans in one transaction."""
+    rows = [{**p.model_dump(), "source": "manual"} for p in plans]
+    with db.begin():
+        for i in range(0, len(rows), _BULK_CHUNK_SIZE):
+            db.execute(insert(InsurancePlan), rows[i:i + _BULK_CHUNK_SIZE])
+        bump_plans_version(db)
+    _refresh_plans_snapshot()
+    return {"inserted": len(rows)}
+
+
 @app.put("/api/plans/{plan_id}", response_model=PlanOut)
 def update_plan(plan_id: int, updates: PlanUpdate, db: Session = Depends(get_db)):
     """Update an existing insurance plan."""
@@ -495,8 +431,10 @@ def update_plan(plan_id: int, updates: PlanUpdate, db: Session = Depends(get_db)
         raise HTTPException(status_code=404, detail="Plan not found")
     for field, value in updates.model_dump(exclude_none=True).items():
         setattr(plan, field, value)
+    bump_plans_version(db)
     db.commit()
     db.refresh(plan)
+    _refresh_plans_snapshot()
     return plan
 
 
@@ -507,25 +445,28 @@ def delete_plan(plan_id: int, db: Session = Depends(get_db)):
     if not plan:
         raise HTTPException(status_code=404, detail="Plan not found")
     db.delete(plan)
+    bump_plans_version(db)
     db.commit()
+    _refresh_plans_snapshot()
     return {"message": f"Plan '{plan.plan_name}' deleted successfully"}
 
 
 @app.get("/api/plans/{plan_id}", response_model=PlanOut)
 def get_plan(plan_id: int, db: Session = Depends(get_db)):
     """Get a single plan by ID."""
-    plan = db.query(InsurancePlan).filter(InsurancePlan.id == plan_id).first()
-    if not plan:
+    row = db.execute(select(*_PLAN_COLUMNS).where(InsurancePlan.id == plan_id)).mappings().first()
+    if not row:
         raise HTTPException(status_code=404, detail="Plan not found")
-    return plan
+    # Serialize in pydantic-core and return the bytes as-is, skipping a second pass through response_model
+    return Response(content=PlanOut.model_validate(row).model_dump_json(), media_type="application/json")
 
 
-# ── Serve built React frontend (production) ───────────────────────────────────
+# Each method + path must be registered exactly once
+_route_keys = [(r.path, tuple(sorted(getattr(r, "methods", None) or ()))) for r in app.routes]
+assert len(set(_route_keys)) == len(_route_keys), "Duplicate route registration in main.py"
 
-_frontend_dist = os.path.join(os.path.dirname(__file__), "..", "frontend", "dist")
-if os.path.isdir(_frontend_dist):
-    app.mount("/", StaticFiles(directory=_frontend_dist, html=True), name="static")
 
+# ── Serve built React frontend (production) ───────────────────────────────────
 
 _frontend_dist = os.path.join(os.path.dirname(__file__), "..", "frontend", "dist")
 if os.path.isdir(_frontend_dist):
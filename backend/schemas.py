@@ -0,0 +1,87 @@
+"""
+Pydantic request/response schemas for the Term Insurance Analyzer API.
+"""
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class PlanOut(BaseModel):
+    id: int
+    plan_name: str
+    provider: str
+    source: str
+    sum_assured_min: float
+    sum_assured_max: float
+    premium_annual: float
+    policy_term_min: int
+    policy_term_max: int
+    age_min: int
+    age_max: int
+    claim_settlement_ratio: float
+    key_features: str
+    source_url: str
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PlanCreate(BaseModel):
+    plan_name: str = Field(..., min_length=2)
+    provider: str = Field(..., min_length=2)
+    sum_assured_min: float = Field(..., gt=0, description="Min sum assured in Lakhs")
+    sum_assured_max: float = Field(..., gt=0, description="Max sum assured in Lakhs")
+    premium_annual: float = Field(..., gt=0, description="Annual premium in INR")
+    policy_term_min: int = Field(..., ge=1, le=50)
+    policy_term_max: int = Field(..., ge=1, le=60)
+    age_min: int = Field(18, ge=1, le=99)
+    age_max: int = Field(65, ge=1, le=99)
+    claim_settlement_ratio: float = Field(..., ge=0, le=100)
+    key_features: str = Field("", description="Pipe-separated features e.g. 'Feature 1|Feature 2'")
+    source_url: str = Field("", description="Official plan URL")
+
+
+class PlanUpdate(BaseModel):
+    plan_name: Optional[str] = None
+    provider: Optional[str] = None
+    sum_assured_min: Optional[float] = None
+    sum_assured_max: Optional[float] = None
+    premium_annual: Optional[float] = None
+    policy_term_min: Optional[int] = None
+    policy_term_max: Optional[int] = None
+    age_min: Optional[int] = None
+    age_max: Optional[int] = None
+    claim_settlement_ratio: Optional[float] = None
+    key_features: Optional[str] = None
+    source_url: Optional[str] = None
+
+
+class RecommendRequest(BaseModel):
+    age: int = Field(..., ge=18, le=70, description="User's current age")
+    sum_assured: float = Field(..., gt=0, description="Desired sum assured in Lakhs")
+    premium_budget: float = Field(..., gt=0, description="Max annual premium in INR")
+    policy_term: int = Field(..., ge=5, le=50, description="Desired policy term in years")
+    min_csr: float = Field(95.0, ge=0, le=100, description="Minimum claim settlement ratio %")
+
+
+class RecommendResponse(BaseModel):
+    overall_summary: str
+    top_pick: str
+    ranked_plans: list
+    total_plans_analyzed: int
+
+
+class CompareRequest(BaseModel):
+    plan_names: List[str] = Field(..., description="2–3 plan names to compare")
+    user_profile: RecommendRequest
+
+
+class ChatRequest(BaseModel):
+    message: str = Field(..., min_length=1, max_length=1000)
+    user_profile: Optional[RecommendRequest] = None
+    top_plans: Optional[list] = None
+
+
+class PremiumEstimateRequest(BaseModel):
+    age: int = Field(..., ge=18, le=70)
+    sum_assured: float = Field(..., gt=0, description="Sum assured in Lakhs")
+    policy_term: int = Field(..., ge=5, le=50)
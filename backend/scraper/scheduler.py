@@ -10,10 +10,11 @@ Sources (in priority order):
   7. Seed data       — guaranteed fallback    (hardcoded, 29 plans)
 """
 import logging
+import threading
 from datetime import datetime
 from sqlalchemy.orm import Session
 
-from database import SessionLocal, InsurancePlan
+from database import SessionLocal, InsurancePlan, bump_plans_version
 from scraper.seed_data import SEED_PLANS
 from scraper.bankbazaar import scrape_bankbazaar
 from scraper.policyx import scrape_policyx
@@ -26,6 +27,28 @@ from scraper.insurancedekho import scrape_insurancedekho
 
 logger = logging.getLogger(__name__)
 
+SCRAPE_JOB_ID = "scrape_job"
+SCRAPE_NOW_JOB_ID = "scrape_now"
+
+# Shared by the periodic job, manual triggers and the startup scrape
+_scrape_lock = threading.Lock()
+
+_completion_callbacks = []
+
+
+def on_scrape_complete(callback):
+    """Register a no-arg callback to run after every scrape job finishes."""
+    if callback not in _completion_callbacks:
+        _completion_callbacks.append(callback)
+
+
+def _notify_scrape_complete():
+    for callback in _completion_callbacks:
+        try:
+            callback()
+        except Exception as e:
+            logger.warning(f"Scrape completion callback failed: {e}")
+
 
 def _upsert_plans(plans: list, db: Session):
     """Insert or update plans matched by plan_name + provider."""
@@ -44,6 +67,7 @@ def _upsert_plans(plans: list, db: Session):
             existing.scraped_at = datetime.utcnow()
         else:
             db.add(InsurancePlan(**p))
+    bump_plans_version(db)
     db.commit()
 
 
@@ -51,7 +75,11 @@ def run_scrape_job():
     """
     Full scrape job — runs all sources, seeds if DB is empty.
     Order: seed (if empty) → PolicyX → Coverfox → CoverfoxCSR → MaxLife → HDFCLife → BankBazaar → PolicyBazaar → InsuranceDekho
+    Skipped if another scrape (periodic, manual or startup) is still running.
     """
+    if not _scrape_lock.acquire(blocking=False):
+        logger.info("Scrape already running — skipping this trigger")
+        return
     db = SessionLocal()
     try:
         total = db.query(InsurancePlan).count()
@@ -160,6 +188,8 @@ def run_scrape_job():
         logger.error(f"Scrape job error: {e}")
     finally:
         db.close()
+        _notify_scrape_complete()
+        _scrape_lock.release()
 
 
 def start_scheduler():
@@ -171,10 +201,33 @@ def start_scheduler():
         run_scrape_job,
         trigger="interval",
         hours=12,
-        id="scrape_job",
+        id=SCRAPE_JOB_ID,
         replace_existing=True,
+        coalesce=True,
+        max_instances=1,
     )
     scheduler.start()
     logger.info("Scheduler started — scrape runs every 12 hours")
     return scheduler
 
+
+def is_scrape_running() -> bool:
+    return _scrape_lock.locked()
+
+
+def trigger_scrape_now(scheduler) -> bool:
+    """
+    Queue a one-shot scrape to run immediately, leaving the 12-hour schedule
+    untouched. Returns False (and queues nothing) if a scrape is already running.
+    """
+    if is_scrape_running():
+        return False
+    scheduler.add_job(
+        run_scrape_job,
+        id=SCRAPE_NOW_JOB_ID,
+        replace_existing=True,
+        coalesce=True,
+        max_instances=1,
+    )
+    return True
+
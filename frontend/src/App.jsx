@@ -32,7 +32,7 @@ export default function App() {
 
   // Load stats on mount
   useEffect(() => {
-    fetch(`${API_BASE}/api/stats`)
+    fetch(`${API_BASE}/api/stats`, { cache: 'no-cache' })
       .then((r) => r.json())
       .then(setStats)
       .catch(() => {})
@@ -70,7 +70,7 @@ export default function App() {
       await fetch(`${API_BASE}/api/scrape`, { method: 'POST' })
       setTimeout(() => {
         setScraping(false)
-        fetch(`${API_BASE}/api/stats`).then((r) => r.json()).then(setStats).catch(() => {})
+        fetch(`${API_BASE}/api/stats`, { cache: 'no-cache' }).then((r) => r.json()).then(setStats).catch(() => {})
       }, 3500)
     } catch {
       setScraping(false)
@@ -26,7 +26,7 @@ export default function ManagePlans() {
   const fetchPlans = useCallback(async () => {
     setLoading(true)
     try {
-      const res = await fetch(`${API_BASE}/api/plans`)
+      const res = await fetch(`${API_BASE}/api/plans?limit=500`, { cache: 'no-cache' })
       const data = await res.json()
       setPlans(data)
     } finally {